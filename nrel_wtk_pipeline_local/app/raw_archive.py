@@ -0,0 +1,292 @@
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, TextIO, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is used when zstandard is missing
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHUNK_SIZE = 1024 * 64
+CODEC_EXT = {'zstd': '.zst', 'gzip': '.gz'}
+
+# NREL ZIP members: <site>_<lat>_<lon>_<year>.csv
+_MEMBER_RE = re.compile(r'^(\d+)_-?[\d.]+_-?[\d.]+_(\d{4})\.csv$')
+# Direct CSV downloads (see storage.raw_file_path): <dataset>_<year>_<lon>_<lat>.csv
+_DIRECT_RE = re.compile(r'^(.+)_(\d{4})_(-?[\d.]+_-?[\d.]+)\.csv$')
+
+
+def default_codec() -> str:
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def parse_csv_name(name: str) -> Tuple[Optional[str], str, int]:
+    """Return (dataset or None, site, year) parsed from an NREL CSV file name."""
+    base = Path(name).name
+    m = _MEMBER_RE.match(base)
+    if m:
+        return None, m.group(1), int(m.group(2))
+    m = _DIRECT_RE.match(base)
+    if m:
+        return m.group(1), m.group(3), int(m.group(2))
+    raise ValueError(f'Unrecognised NREL CSV name: {name}')
+
+
+def new_batch_id() -> str:
+    """Sortable UTC stamp identifying one ingest or compaction run."""
+    return datetime.utcnow().strftime('%Y%m%dT%H%M%S.%fZ')
+
+
+def non_csv_members(zip_path) -> List[str]:
+    """ZIP members add_zip would not archive (README, metadata, ...)."""
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        return [i.filename for i in zf.infolist()
+                if not i.is_dir() and not i.filename.lower().endswith('.csv')]
+
+
+def _compressor(codec: str, raw: BinaryIO) -> BinaryIO:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).stream_writer(raw)
+    return gzip.GzipFile(fileobj=raw, mode='wb', mtime=0)
+
+
+class RawArchive:
+    """Content-addressed, compressed store for raw NREL CSVs.
+
+    Each blob is keyed by the SHA-256 of its uncompressed bytes, so the same
+    CSV downloaded or extracted several times is stored once. ``catalog.json``
+    maps ``dataset/site/year`` to the blob currently holding that data, and
+    tags each entry with the batch that last delivered it and its ``origin``
+    (``ingest`` or ``compaction``). ``source`` is relative to ``data_dir``.
+    """
+    def __init__(self, root, codec: Optional[str] = None, data_dir=None):
+        self.root = Path(root)
+        self.blob_dir = self.root / 'blobs'
+        self.catalog_file = self.root / 'catalog.json'
+        self.lock_file = self.root / 'catalog.lock'
+        self.data_dir = Path(data_dir).resolve() if data_dir else None
+        self.codec = codec or default_codec()
+        if self.codec not in CODEC_EXT:
+            raise ValueError(f'Unknown archive codec: {self.codec}')
+        if self.codec == 'zstd' and zstandard is None:
+            raise RuntimeError('zstd archive codec requires the zstandard package')
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    # ------------------ Catalog ------------------
+    @staticmethod
+    def key(dataset: str, site: str, year: int) -> str:
+        return f'{dataset}/{site}/{year}'
+
+    @contextmanager
+    def _locked(self):
+        """Serialise catalog read-modify-write across processes (ingest, load, compaction)."""
+        with open(self.lock_file, 'a+') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _source(self, path: Path) -> str:
+        path = Path(path).resolve()
+        if self.data_dir is not None and self.data_dir in path.parents:
+            return path.relative_to(self.data_dir).as_posix()
+        return path.name
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.catalog_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save(self, catalog: Dict[str, Dict]):
+        # Write-then-rename so readers never see a half-written catalog
+        tmp = self.catalog_file.with_suffix('.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(catalog, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.catalog_file)
+
+    def get(self, dataset: str, site: str, year: int) -> Optional[Dict]:
+        return self._load().get(self.key(dataset, site, year))
+
+    def entries(self, dataset: Optional[str] = None) -> List[Dict]:
+        items = self._load().values()
+        return sorted((e for e in items if dataset in (None, e['dataset'])),
+                      key=lambda e: (e['dataset'], e['site'], e['year']))
+
+    def latest_entries(self) -> List[Dict]:
+        """Entries delivered by the most recent ingest batch.
+
+        Compaction batches only count when nothing has been ingested yet, so
+        folding legacy files into the archive never masks the last download.
+        """
+        entries = self.entries()
+        ingested = [e for e in entries if e.get('origin', 'ingest') == 'ingest']
+        entries = ingested or entries
+        if not entries:
+            return []
+        newest = max(e['batch'] for e in entries)
+        return [e for e in entries if e['batch'] == newest]
+
+    # ------------------ Blobs ------------------
+    def blob_path(self, sha256: str) -> Optional[Path]:
+        """Return the stored blob for a digest, whichever codec it was written with."""
+        for ext in CODEC_EXT.values():
+            p = self.blob_dir / sha256[:2] / f'{sha256}.csv{ext}'
+            if p.exists():
+                return p
+        return None
+
+    def open_blob(self, entry: Dict) -> BinaryIO:
+        """Open an entry's blob as a decompressing binary stream."""
+        path = self.blob_path(entry['sha256'])
+        if path is None:
+            raise FileNotFoundError(f"Missing archive blob {entry['sha256']}")
+        if path.suffix == CODEC_EXT['zstd']:
+            if zstandard is None:
+                raise RuntimeError(f'{path} is zstd-compressed; install zstandard to read it')
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')))
+        return gzip.open(path, 'rb')
+
+    def open_text(self, entry: Dict, encoding: str = 'utf-8-sig') -> TextIO:
+        """Open an entry as a text stream suitable for csv.reader."""
+        return io.TextIOWrapper(self.open_blob(entry), encoding=encoding, newline='')
+
+    def orphan_blobs(self) -> List[Path]:
+        """Blobs no catalog entry points at (e.g. superseded by a re-ingest)."""
+        referenced = {e['sha256'] for e in self._load().values()}
+        return sorted(p for p in self.blob_dir.rglob('*.csv.*')
+                      if p.name.split('.', 1)[0] not in referenced)
+
+    def remove_orphan_blobs(self) -> List[Path]:
+        # Under the catalog lock so a blob being committed by put_stream is never swept
+        with self._locked():
+            orphans = self.orphan_blobs()
+            for p in orphans:
+                p.unlink()
+        return orphans
+
+    def _compress(self, src: BinaryIO) -> Tuple[str, int, str]:
+        """Hash and compress src in one pass into a temp file inside blob_dir."""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.blob_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as raw:
+            writer = _compressor(self.codec, raw)
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+                writer.write(chunk)
+            writer.close()
+        return digest.hexdigest(), size, tmp
+
+    def _commit_blob(self, sha256: str, tmp: str) -> Path:
+        """Move a compressed temp file into place unless the blob already exists."""
+        path = self.blob_path(sha256)
+        if path is None:
+            path = self.blob_dir / sha256[:2] / f'{sha256}.csv{CODEC_EXT[self.codec]}'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(tmp, 0o644)  # mkstemp creates 0600; other containers read the archive
+            os.replace(tmp, path)
+        return path
+
+    # ------------------ Writers ------------------
+    def put_stream(self, src: BinaryIO, dataset: str, site: str, year: int, name: str,
+                   source: str = '', batch: Optional[str] = None, replace: bool = True,
+                   origin: str = 'ingest') -> Dict:
+        """Archive one CSV stream under dataset/site/year.
+
+        With ``replace=False`` an existing catalog entry is returned untouched.
+        Re-archiving identical bytes keeps the entry's ``archived_at`` and only
+        moves it into the new batch.
+        """
+        key = self.key(dataset, site, year)
+        if not replace:
+            existing = self._load().get(key)
+            if existing is not None:
+                return existing
+        sha256, size, tmp = self._compress(src)
+        try:
+            with self._locked():
+                catalog = self._load()
+                current = catalog.get(key)
+                if current is not None and not replace:
+                    return current
+                path = self._commit_blob(sha256, tmp)
+                entry = {
+                    'dataset': dataset,
+                    'site': str(site),
+                    'year': int(year),
+                    'sha256': sha256,
+                    'codec': 'zstd' if path.suffix == CODEC_EXT['zstd'] else 'gzip',
+                    'size': size,
+                    'stored_size': path.stat().st_size,
+                    'name': name,
+                    'source': source,
+                    'batch': batch or new_batch_id(),
+                    'origin': origin,
+                    'archived_at': datetime.utcnow().strftime('%Y%m%dT%H%M%S.%fZ'),
+                }
+                if current is not None and current['sha256'] == sha256:
+                    entry['archived_at'] = current['archived_at']
+                catalog[key] = entry
+                self._save(catalog)
+                return entry
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def put_file(self, csv_path, dataset: Optional[str] = None, batch: Optional[str] = None,
+                 replace: bool = True, origin: str = 'ingest') -> Dict:
+        """Archive a CSV on disk; site/year (and dataset, if encoded) come from its name."""
+        csv_path = Path(csv_path)
+        name_dataset, site, year = parse_csv_name(csv_path.name)
+        dataset = name_dataset or dataset
+        if not dataset:
+            raise ValueError(f'No dataset given for {csv_path}')
+        with open(csv_path, 'rb') as src:
+            return self.put_stream(src, dataset, site, year, csv_path.name,
+                                   source=self._source(csv_path), batch=batch, replace=replace,
+                                   origin=origin)
+
+    def add_zip(self, zip_path, dataset: str, batch: Optional[str] = None,
+                replace: bool = True, origin: str = 'ingest') -> List[Dict]:
+        """Stream every CSV member of an NREL ZIP into the archive as one batch, without extracting it."""
+        zip_path = Path(zip_path)
+        batch = batch or new_batch_id()
+        entries = []
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not info.filename.lower().endswith('.csv'):
+                    continue
+                _, site, year = parse_csv_name(info.filename)
+                with zf.open(info) as src:
+                    entries.append(self.put_stream(src, dataset, site, year, info.filename,
+                                                   source=self._source(zip_path), batch=batch,
+                                                   replace=replace, origin=origin))
+        return entries
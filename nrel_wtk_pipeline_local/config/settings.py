@@ -13,11 +13,18 @@ DATA_DIR = Path(os.getenv("WTK_OUT_DIR", PROJECT_ROOT / "data"))
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = RAW_DIR / "processed"
 EXTRACT_DIR = RAW_DIR / "extracted"
+ARCHIVE_DIR = RAW_DIR / "archive"
 
 # Ensure directories exist
-for d in (DATA_DIR, RAW_DIR, PROCESSED_DIR, EXTRACT_DIR):
+for d in (DATA_DIR, RAW_DIR, PROCESSED_DIR, EXTRACT_DIR, ARCHIVE_DIR):
     d.mkdir(parents=True, exist_ok=True)
 
+# --- Raw Archive ---
+# Dataset slug recorded in the archive catalog for ZIP downloads
+WTK_DATASET = os.getenv("WTK_DATASET", "wtk-download")
+# "zstd" (needs the zstandard package) or "gzip"; empty picks zstd when available
+ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC", "") or None
+
 # --- MySQL Settings ---
 MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
 MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
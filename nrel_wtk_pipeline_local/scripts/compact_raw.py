@@ -0,0 +1,199 @@
+
+# scripts/compact_raw.py
+import argparse
+import hashlib
+import zipfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Try to import settings; if not, add project root to sys.path
+try:
+    from config import settings
+except ModuleNotFoundError:
+    import sys as _sys
+    from pathlib import Path as _Path
+    root = _Path(__file__).resolve().parent.parent
+    _sys.path.append(str(root))
+    from config import settings
+
+from app.raw_archive import RawArchive, new_batch_id, non_csv_members, parse_csv_name
+
+# Left behind by runs with WTK_OUT_DIR pointing at data/raw
+LEGACY_EXTRACT_DIR = settings.RAW_DIR / "raw" / "extracted"
+
+
+# ------------------ Discovery ------------------
+def find_raw_files() -> Tuple[List[Path], List[Path], List[Path]]:
+    """Return (zips, csvs, json acks) from the raw download and extract locations only."""
+    processed = settings.PROCESSED_DIR.resolve()
+    zips, acks, csvs = [], [], []
+    for d in (settings.DATA_DIR, settings.RAW_DIR):
+        zips.extend(d.glob("wtk_data_*.zip"))
+        acks.extend(d.glob("wtk_raw_*.json"))
+    csvs.extend(settings.RAW_DIR.glob("*.csv"))
+    for d in (settings.EXTRACT_DIR, LEGACY_EXTRACT_DIR):
+        if d.is_dir():
+            csvs.extend(d.rglob("*.csv"))
+    csvs = [p for p in csvs if processed not in p.resolve().parents]
+    # Newest ZIP first (names carry the download timestamp) so it wins keys not yet catalogued
+    return sorted(set(zips), key=lambda p: p.name, reverse=True), sorted(set(csvs)), sorted(set(acks))
+
+
+def zip_keys(zip_path: Path, dataset: str) -> Optional[List[str]]:
+    """Catalog keys for a ZIP's members, or None if it cannot be fully archived."""
+    try:
+        if non_csv_members(zip_path):
+            print(f"[WARN] {zip_path} has non-CSV members; keeping it.")
+            return None
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            return [csv_name_key(i.filename, dataset) for i in zf.infolist() if not i.is_dir()]
+    except (zipfile.BadZipFile, ValueError) as e:
+        print(f"[WARN] Skipping {zip_path}: {e}")
+        return None
+
+
+def csv_name_key(name: str, dataset: str) -> str:
+    name_dataset, site, year = parse_csv_name(name)
+    return RawArchive.key(name_dataset or dataset, site, year)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 64), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_digests(path: Path) -> List[str]:
+    """SHA-256 of a CSV, or of every member of a ZIP, as the archive would key them."""
+    if path.suffix != ".zip":
+        return [file_sha256(path)]
+    digests = []
+    with zipfile.ZipFile(path, "r") as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            digest = hashlib.sha256()
+            with zf.open(info) as src:
+                for chunk in iter(lambda: src.read(1024 * 64), b""):
+                    digest.update(chunk)
+            digests.append(digest.hexdigest())
+    return digests
+
+
+def archived_files(archive: RawArchive, paths: List[Path]) -> Tuple[List[Path], List[Path]]:
+    """Split paths into (all content referenced by the catalog, not fully archived)."""
+    stored = {e["sha256"] for e in archive.entries()}
+    covered, kept = [], []
+    for p in paths:
+        (covered if set(content_digests(p)) <= stored else kept).append(p)
+    return covered, kept
+
+
+def keys_of(entries: List[dict]) -> set:
+    return {RawArchive.key(e["dataset"], e["site"], e["year"]) for e in entries}
+
+
+def du(paths: List[Path]) -> int:
+    return sum(p.stat().st_size for p in paths if p.exists())
+
+
+# ------------------ Compaction ------------------
+def plan_compaction(zips: List[Path], csvs: List[Path], dataset: str) -> Tuple[List[Path], List[Path], set]:
+    """Return (archivable zips, archivable csvs, their catalog keys) without touching the archive."""
+    ok_zips, ok_csvs, keys = [], [], set()
+    for zip_path in zips:
+        member_keys = zip_keys(zip_path, dataset)
+        if member_keys is not None:
+            ok_zips.append(zip_path)
+            keys.update(member_keys)
+    for csv_path in csvs:
+        try:
+            keys.add(csv_name_key(csv_path.name, dataset))
+        except ValueError as e:
+            print(f"[WARN] Skipping {csv_path}: {e}")
+            continue
+        ok_csvs.append(csv_path)
+    return ok_zips, ok_csvs, keys
+
+
+def duplicate_acks(acks: List[Path]) -> List[Path]:
+    """Byte-identical JSON acks beyond the first (oldest name) of each."""
+    seen = set()
+    dupes = []
+    for ack in sorted(acks, key=lambda p: p.name):
+        sha = file_sha256(ack)
+        if sha in seen:
+            dupes.append(ack)
+        seen.add(sha)
+    return dupes
+
+
+def remove_empty_dirs() -> None:
+    for base in (settings.EXTRACT_DIR, LEGACY_EXTRACT_DIR.parent):
+        if not base.is_dir():
+            continue
+        dirs = sorted((p for p in base.rglob("*") if p.is_dir()), key=lambda p: len(p.parts), reverse=True)
+        for d in dirs + ([base] if base != settings.EXTRACT_DIR else []):
+            if not any(d.iterdir()):
+                d.rmdir()
+
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Dedupe raw WTK downloads into the compressed archive.")
+    parser.add_argument("--dataset", default=settings.WTK_DATASET,
+                        help="Dataset slug for ZIP members and CSVs whose name does not carry one.")
+    parser.add_argument("--prune", action="store_true",
+                        help="Archive, then delete archived ZIPs/CSVs, duplicate JSON acks and orphaned blobs.")
+    args = parser.parse_args()
+
+    archive = RawArchive(settings.ARCHIVE_DIR, codec=settings.ARCHIVE_CODEC, data_dir=settings.DATA_DIR)
+    zips, csvs, acks = find_raw_files()
+    ok_zips, ok_csvs, keys = plan_compaction(zips, csvs, args.dataset)
+    catalogued = keys_of(archive.entries())
+    dupe_acks = duplicate_acks(acks)
+    orphans = archive.orphan_blobs()
+
+    print(f"[INFO] {len(zips)} ZIP(s), {len(csvs)} CSV(s), {len(acks)} ack(s): {du(zips + csvs + acks)} B on disk")
+    print(f"[INFO] {len(keys - catalogued)} new catalog key(s); existing keys are left as they are")
+
+    if not args.prune:
+        covered, _ = archived_files(archive, ok_zips + ok_csvs)
+        redundant = covered + dupe_acks
+        print(f"[INFO] {len(redundant)} file(s) ({du(redundant)} B) already archived and "
+              f"{len(orphans)} orphaned blob(s) ({du(orphans)} B) can be removed; re-run with --prune.")
+        return
+
+    # Fill missing keys only; an existing entry may hold newer ingested content
+    batch = new_batch_id()
+    for zip_path in ok_zips:
+        entries = archive.add_zip(zip_path, args.dataset, batch=batch, replace=False, origin="compaction")
+        added = len(keys_of(entries) - catalogued)
+        catalogued |= keys_of(entries)
+        print(f"[INFO] {zip_path}: {added} CSV(s) archived, {len(entries) - added} already catalogued, skipped")
+    for csv_path in ok_csvs:
+        entry = archive.put_file(csv_path, dataset=args.dataset, batch=batch, replace=False, origin="compaction")
+        status = "already catalogued, skipped" if keys_of([entry]) <= catalogued else "archived"
+        catalogued |= keys_of([entry])
+        print(f"[INFO] {csv_path}: {status}")
+
+    # Only delete files whose every byte is held by a catalogued blob
+    covered, kept = archived_files(archive, ok_zips + ok_csvs)
+    for p in kept:
+        print(f"[WARN] Keeping {p}: its content differs from the catalogued entry and is not archived")
+    for p in covered + dupe_acks:
+        p.unlink()
+        print(f"[INFO] Removed {p}")
+    for p in archive.remove_orphan_blobs():
+        print(f"[INFO] Removed orphaned blob {p}")
+    remove_empty_dirs()
+
+    blobs = list(archive.blob_dir.rglob("*.csv.*"))
+    print(f"[INFO] Archive: {len(archive.entries())} catalog entries, {len(blobs)} blob(s), {du(blobs)} B")
+    print("[INFO] Compaction done.")
+
+
+if __name__ == "__main__":
+    main()
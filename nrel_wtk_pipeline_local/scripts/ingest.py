@@ -9,17 +9,26 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Try to import settings; if not, add project root to sys.path
+try:
+    from config import settings
+except ModuleNotFoundError:
+    root = Path(__file__).resolve().parent.parent
+    sys.path.append(str(root))
+    from config import settings
+
+from app.raw_archive import RawArchive, non_csv_members
+
 API_KEY = os.getenv("NREL_API_KEY")
 EMAIL = os.getenv("NREL_EMAIL")  # Add your email in .env
 WKT = os.getenv("WTK_WKT", "POINT(-104.9903 39.7392)")  # Example: Denver, CO
 YEARS = os.getenv("WTK_YEARS", "2013")  # Example: single year or comma-separated
-OUT_DIR = Path(os.getenv("WTK_OUT_DIR", "data"))
 
 if not API_KEY or not EMAIL:
     print("[ERROR] Missing API key or email in .env")
     sys.exit(1)
 
-url = "https://developer.nrel.gov/api/wind-toolkit/v2/wind/wtk-download.json"
+url = f"https://developer.nrel.gov/api/wind-toolkit/v2/wind/{settings.WTK_DATASET}.json"
 params = {
     "api_key": API_KEY,
     "email": EMAIL,
@@ -34,12 +43,17 @@ response = requests.get(url, params=params)
 
 print(f"[INFO] HTTP {response.status_code}")
 if response.status_code == 200:
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
     ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    out_path = OUT_DIR / f"wtk_raw_{ts}.json"
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(response.text)
-    print(f"[INFO] Data saved to {out_path}")
+    # Acks for the same request are byte-identical; keep only the first
+    same_ack = next((p for p in sorted(settings.DATA_DIR.glob("wtk_raw_*.json"))
+                     if p.read_text(encoding="utf-8") == response.text), None)
+    if same_ack:
+        print(f"[INFO] Identical response already saved at {same_ack}")
+    else:
+        out_path = settings.DATA_DIR / f"wtk_raw_{ts}.json"
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"[INFO] Data saved to {out_path}")
     
 else:
     print("[ERROR] Failed:", response.text)
@@ -50,14 +64,24 @@ download_url = metadata.get("outputs", {}).get("downloadUrl")
 
 if download_url:
     print(f"[INFO] Download URL: {download_url}")
-    # Download the actual data file
+    # Download the actual data file; its CSVs go into the raw archive, not a timestamped ZIP copy
     file_resp = requests.get(download_url, stream=True)
     if file_resp.status_code == 200:
-        zip_path = OUT_DIR / f"wtk_data_{ts}.zip"
+        archive = RawArchive(settings.ARCHIVE_DIR, codec=settings.ARCHIVE_CODEC, data_dir=settings.DATA_DIR)
+        zip_path = settings.DATA_DIR / f"wtk_data_{ts}.zip"
         with open(zip_path, "wb") as f:
             for chunk in file_resp.iter_content(chunk_size=8192):
                 f.write(chunk)
         print(f"[INFO] Data file downloaded: {zip_path}")
+        for entry in archive.add_zip(zip_path, settings.WTK_DATASET):
+            print(f"[INFO] Archived {entry['name']} -> {entry['sha256'][:12]} "
+                  f"({entry['size']} B raw, {entry['stored_size']} B stored)")
+        # Keep the ZIP if archiving failed (compact_raw.py retries) or it carries non-CSV files
+        extra = non_csv_members(zip_path)
+        if extra:
+            print(f"[WARN] Keeping {zip_path}: non-CSV members not archived: {', '.join(extra)}")
+        else:
+            zip_path.unlink()
     else:
         print(f"[ERROR] Failed to download data file: {file_resp.status_code}")
 else:
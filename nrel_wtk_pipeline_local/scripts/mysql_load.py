@@ -3,9 +3,8 @@
 import csv
 import re
 import sys
-import zipfile
 from pathlib import Path
-from typing import List, Iterable
+from typing import Dict, List, Iterable
 
 # Try to import settings; if not, add project root to sys.path
 try:
@@ -17,6 +16,7 @@ except ModuleNotFoundError:
     _sys.path.append(str(root))
     from config import settings
 
+from app.raw_archive import RawArchive
 import mysql.connector
 
 
@@ -72,7 +72,7 @@ def connect_mysql():
         sys.exit(1)
 
 
-# ------------------ ZIP & CSV ------------------
+# ------------------ ZIP & Archive ------------------
 def find_latest_zip() -> Path:
     # Search in data/raw and data root for wtk_data_*.zip
     candidates = []
@@ -85,15 +85,15 @@ def find_latest_zip() -> Path:
     return candidates[0]
 
 
-def unzip_data(zip_path: Path, extract_to: Path) -> None:
-    extract_to.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(extract_to)
-    print(f"[INFO] Extracted: {zip_path} -> {extract_to}")
-
-
-def find_csv_files(root: Path) -> List[Path]:
-    return [p for p in root.rglob("*.csv")]
+def archived_csv_entries(archive: RawArchive) -> List[Dict]:
+    """CSV entries from the latest ingest; archive the newest ZIP if the catalog is empty."""
+    entries = archive.latest_entries()
+    if entries:
+        return entries
+    latest_zip = find_latest_zip()
+    entries = archive.add_zip(latest_zip, settings.WTK_DATASET)
+    print(f"[INFO] Archived {len(entries)} CSV(s) from {latest_zip}")
+    return entries
 
 
 # ------------------ Row length safety helpers ------------------
@@ -203,11 +203,11 @@ def bulk_insert(conn, table_name: str, headers: List[str], rows_iter, chunk_size
     cursor.close()
 
 
-def load_csv_into_mysql(conn, csv_path: Path, table_name: str, delimiter: str = ","):
-    print(f"[INFO] Loading CSV: {csv_path}")
+def load_csv_into_mysql(conn, archive: RawArchive, entry: Dict, table_name: str, delimiter: str = ","):
+    print(f"[INFO] Loading CSV: {entry['name']} ({entry['dataset']}/{entry['site']}/{entry['year']})")
 
-    # Read header and sample rows using UTF-8 with BOM handling
-    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+    # Read header and sample rows, decompressing from the archive (UTF-8 with BOM handling)
+    with archive.open_text(entry) as f:
         reader = csv.reader(f, delimiter=delimiter)
         headers = next(reader)  # header line
         header_len = len(headers)
@@ -223,7 +223,7 @@ def load_csv_into_mysql(conn, csv_path: Path, table_name: str, delimiter: str =
     create_table_if_not_exists(conn, table_name, headers, sample_rows)
 
     # Re-read CSV and insert all rows safely
-    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+    with archive.open_text(entry) as f:
         reader = csv.reader(f, delimiter=delimiter)
         headers = next(reader)  # skip header
         header_len = len(headers)
@@ -233,19 +233,17 @@ def load_csv_into_mysql(conn, csv_path: Path, table_name: str, delimiter: str =
 
 # ------------------ Main ------------------
 def main():
-    latest_zip = find_latest_zip()
-    unzip_data(latest_zip, settings.EXTRACT_DIR)
-
-    csv_files = find_csv_files(settings.EXTRACT_DIR)
-    if not csv_files:
-        print("[ERROR] No CSV files found in extracted data.")
+    archive = RawArchive(settings.ARCHIVE_DIR, codec=settings.ARCHIVE_CODEC, data_dir=settings.DATA_DIR)
+    entries = archived_csv_entries(archive)
+    if not entries:
+        print("[ERROR] No CSV files found in archived data.")
         sys.exit(1)
 
     conn = connect_mysql()
-    for csv_path in csv_files:
-        # table_name = sanitize_identifier(f"wtk_{csv_path.stem}")
+    for entry in entries:
+        # table_name = sanitize_identifier(f"wtk_{entry['site']}_{entry['year']}")
         FIXED_TABLE_NAME = "wtk_raw_data"
-        load_csv_into_mysql(conn, csv_path, FIXED_TABLE_NAME)
+        load_csv_into_mysql(conn, archive, entry, FIXED_TABLE_NAME)
     conn.close()
     print("[INFO] All done.")
 
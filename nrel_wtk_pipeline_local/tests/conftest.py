@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "scripts")]
+
+# config.settings creates its data dirs on import; keep them out of the repo
+os.environ.setdefault("WTK_OUT_DIR", tempfile.mkdtemp(prefix="wtk_test_"))
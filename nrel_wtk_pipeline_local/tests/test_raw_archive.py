@@ -0,0 +1,97 @@
+import csv
+import io
+import sys
+import zipfile
+
+import pytest
+
+from app.raw_archive import RawArchive
+
+
+def site_csv(site, value="1"):
+    return f"SiteID,{site}\nYear,Value\n2013,{value}\n".encode()
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_open_text_round_trip(tmp_path, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    archive = RawArchive(tmp_path / "archive", codec=codec)
+    entry = archive.put_stream(io.BytesIO(site_csv(100)), "wtk-download", "100", 2013, "100.csv")
+
+    assert entry["codec"] == codec
+    with archive.open_text(entry) as f:
+        rows = list(csv.reader(f))
+    assert rows == [["SiteID", "100"], ["Year", "Value"], ["2013", "1"]]
+
+
+def test_identical_bytes_stored_once(tmp_path):
+    archive = RawArchive(tmp_path / "archive", codec="gzip")
+    first = archive.put_stream(io.BytesIO(site_csv(100)), "wtk-download", "100", 2013, "a.csv")
+    second = archive.put_stream(io.BytesIO(site_csv(100)), "wtk-download", "100", 2013, "b.csv")
+    archive.put_stream(io.BytesIO(site_csv(100)), "wtk-download", "100", 2014, "c.csv")
+
+    assert len(list(archive.blob_dir.rglob("*.csv.*"))) == 1
+    assert second["archived_at"] == first["archived_at"]
+    assert second["batch"] != first["batch"]
+
+
+@pytest.fixture
+def compact(tmp_path, monkeypatch):
+    """Run compact_raw.py against a scratch DATA_DIR."""
+    import compact_raw
+    from config import settings
+
+    data = tmp_path / "data"
+    dirs = {"DATA_DIR": data, "RAW_DIR": data / "raw", "EXTRACT_DIR": data / "raw" / "extracted",
+            "PROCESSED_DIR": data / "raw" / "processed", "ARCHIVE_DIR": data / "raw" / "archive"}
+    for name, d in dirs.items():
+        d.mkdir(parents=True, exist_ok=True)
+        monkeypatch.setattr(settings, name, d)
+    monkeypatch.setattr(settings, "ARCHIVE_CODEC", "gzip")
+    monkeypatch.setattr(compact_raw, "LEGACY_EXTRACT_DIR", data / "raw" / "raw" / "extracted")
+
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", ["compact_raw.py", *args])
+        compact_raw.main()
+        return RawArchive(dirs["ARCHIVE_DIR"], data_dir=data)
+
+    return run
+
+
+def test_latest_entries_prefers_ingest_over_compaction(tmp_path, compact):
+    data = tmp_path / "data"
+    archive = RawArchive(data / "raw" / "archive", codec="gzip", data_dir=data)
+    archive.add_zip(write_zip(tmp_path / "new.zip", {"h/100_1.0_-2.0_2014.csv": site_csv(100),
+                                                     "h/200_1.0_-2.0_2014.csv": site_csv(200)}),
+                    "wtk-download")
+    write_zip(data / "raw" / "wtk_data_20260109T092433Z.zip", {"h/100_1.0_-2.0_2013.csv": site_csv(100, "old")})
+
+    archive = compact("--prune")
+
+    assert archive.get("wtk-download", "100", 2013)["origin"] == "compaction"
+    assert [(e["site"], e["year"]) for e in archive.latest_entries()] == [("100", 2014), ("200", 2014)]
+
+
+def test_prune_keeps_files_not_in_archive(tmp_path, compact):
+    data = tmp_path / "data"
+    archive = RawArchive(data / "raw" / "archive", codec="gzip", data_dir=data)
+    archive.put_stream(io.BytesIO(site_csv(100, "newest")), "wtk-download", "100", 2013, "100.csv")
+    stale = write_zip(data / "wtk_data_20250101T000000Z.zip", {"h/100_1.0_-2.0_2013.csv": site_csv(100, "old")})
+    dupe = write_zip(data / "wtk_data_20250102T000000Z.zip", {"h/100_1.0_-2.0_2013.csv": site_csv(100, "newest")})
+    extra = write_zip(data / "wtk_data_20250103T000000Z.zip", {"h/200_1.0_-2.0_2013.csv": site_csv(200),
+                                                               "README.txt": b"notes"})
+
+    archive = compact("--prune")
+
+    assert stale.exists() and extra.exists()
+    assert not dupe.exists()
+    with archive.open_text(archive.get("wtk-download", "100", 2013)) as f:
+        assert "newest" in f.read()